@@ -1,41 +1,33 @@
 import streamlit as st
 from supabase import create_client, Client
 import os
-from datetime import datetime
+import time
+import threading
+import queue
+import atexit
+import types
+import re
+import hashlib
+import concurrent.futures
+from datetime import datetime, timedelta, timezone
 import pandas as pd
+import numpy as np
 from audio_recorder_streamlit import audio_recorder
-
-# Hack for Python 3.13 compatibility (missing aifc)
-import sys
-if sys.version_info >= (3, 13):
-    try:
-        import aifc
-    except ImportError:
-        import sys
-        # If standard aifc is missing, try to use the backport or mock it
-        try:
-            # Try to import from py-aifc if installed but named differently
-            # Note: py-aifc installs as 'aifc' usually, but let's be safe
-            pass
-        except:
-            pass
-            
-    # Force mock if still missing
-    if 'aifc' not in sys.modules:
-        import types
-        sys.modules['aifc'] = types.ModuleType('aifc')
-        sys.modules['aifc'].Error = Exception
-
-import speech_recognition as sr
-import tempfile
 from dotenv import load_dotenv
 import io
 from pydub import AudioSegment
+import httpx
+import requests
+import deep_translator.google
 from deep_translator import GoogleTranslator
+from faster_whisper import WhisperModel, BatchedInferencePipeline
 
 # Load environment variables
 load_dotenv()
 
+# Language recordings are transcribed in (and translated from)
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en-US")
+
 # Page configuration
 st.set_page_config(
     page_title="Reception Agent - Voice Call System",
@@ -54,29 +46,135 @@ def init_supabase():
         return None
     
     try:
-        return create_client(supabase_url, supabase_key)
+        client = create_client(supabase_url, supabase_key)
+        use_pooled_postgrest_session(client)
+        return client
     except Exception as e:
         st.error(f"❌ Connection error: {str(e)}")
         return None
 
-# Transcription function (FREE - Google Speech Recognition)
-def transcribe_audio_free(audio_file_path, language="en-US"):
-    recognizer = sr.Recognizer()
-    
-    try:
-        # Load audio file
-        with sr.AudioFile(audio_file_path) as source:
-            audio_data = recognizer.record(source)
-            
-        # Transcribe using Google Speech Recognition
-        text = recognizer.recognize_google(audio_data, language=language)
-        return text
-    except sr.UnknownValueError:
+# Swap PostgREST's default session for a keep-alive HTTP/2 pool so every query reuses one TLS connection
+def use_pooled_postgrest_session(client):
+    session = client.postgrest.session
+    client.postgrest.session = httpx.Client(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        transport=httpx.HTTPTransport(http2=True, retries=2),
+    )
+    session.close()
+
+# deep_translator calls requests.get() per translation; route it through one keep-alive session
+@st.cache_resource
+def get_http_session():
+    return requests.Session()
+
+deep_translator.google.requests = types.SimpleNamespace(get=get_http_session().get)
+
+# Long recordings are split at speech pauses into windows of at most
+# ASR_CHUNK_LENGTH seconds, which are decoded together in batches
+ASR_CHUNK_LENGTH = 30
+ASR_BATCH_SIZE = 16
+
+# Load the speech-to-text model once per server process
+@st.cache_resource
+def get_asr():
+    return BatchedInferencePipeline(model=WhisperModel("small", device="auto", compute_type="int8"))
+
+# Shared worker pool so transcriptions run off the Streamlit script thread
+@st.cache_resource
+def get_executor():
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+EXECUTOR = get_executor()
+
+# Check the RIFF/WAVE header so WAV input can skip the ffmpeg decoder
+def is_wav(audio_bytes):
+    return audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE"
+
+# Decode any supported format once, in memory, into the 16 kHz mono samples Whisper expects
+def load_audio_pcm(audio_bytes):
+    # pydub parses WAV in-process; other formats are decoded by an ffmpeg subprocess
+    seg = AudioSegment.from_file(io.BytesIO(audio_bytes), format="wav" if is_wav(audio_bytes) else None)
+    seg = seg.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    return np.frombuffer(seg.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+# Transcription function (FREE - local faster-whisper model)
+# Errors are raised, not returned, so the cache below never stores a failure
+def transcribe_audio_free(audio_bytes, language="en-US", on_segment=None):
+    audio = load_audio_pcm(audio_bytes)
+    # Whisper expects bare language codes ('en-US' -> 'en'); timestamps are not needed
+    segments, info = get_asr().transcribe(
+        audio,
+        batch_size=ASR_BATCH_SIZE,
+        chunk_length=ASR_CHUNK_LENGTH,
+        language=language.split('-')[0],
+        without_timestamps=True,
+        # Silero VAD drops non-speech before decoding, so cost scales with speech, not silence
+        vad_filter=True,
+    )
+    # Segments are decoded lazily; report each one as it lands
+    texts = []
+    for segment in segments:
+        texts.append(segment.text.strip())
+        if on_segment:
+            on_segment(texts[-1])
+    text = " ".join(texts)
+    if not text:
         return "Could not understand audio"
-    except sr.RequestError as e:
-        return f"Could not request results from Google Speech Recognition service: {e}"
-    except Exception as e:
-        return f"Transcription error: {str(e)}"
+    return text
+
+# Cache transcriptions by audio content hash (the raw bytes are not hashed again)
+@st.cache_data(max_entries=128)
+def _transcribe_cached(audio_sha, lang, _audio_bytes, _on_segment=None):
+    return transcribe_audio_free(_audio_bytes, lang, on_segment=_on_segment)
+
+# One translator per source language, shared across reruns and sessions.
+# translate() mutates the instance's request params, so calls hold the lock.
+@st.cache_resource
+def get_translator(source_lang):
+    return GoogleTranslator(source=source_lang, target='en'), threading.Lock()
+
+# Markdown bold spans in the analysis text, converted to HTML for display
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*", re.DOTALL)
+
+# Add plural, -ed and -ing forms to a keyword set, so whole-token matching still
+# catches what the old substring checks did ("problems", "booked", "refunded", "loved")
+def with_inflections(*words):
+    forms = set(words)
+    for word in words:
+        if " " not in word:
+            stem = word[:-1] if word.endswith("e") else word
+            forms.update((word + "s", word + "es", stem + "ed", stem + "ing"))
+    return frozenset(forms)
+
+# Keyword sets for the rule-based analysis (intents are checked in order).
+# Two-word phrases are matched against adjacent word pairs.
+INTENT_SETS = [
+    (with_inflections("buy", "purchase", "order", "price", "cost"), "Sales/Purchase Inquiry"),
+    (with_inflections("problem", "issue", "not working", "broken", "fix", "help"), "Technical Support"),
+    (with_inflections("cancel", "cancelled", "cancelling", "cancellation", "refund", "return", "complaint"), "Complaint/Refund Request"),
+    (with_inflections("information", "details", "tell me", "what is", "how to"), "Information Request"),
+    (with_inflections("appointment", "schedule", "reschedule", "book", "meeting"), "Appointment/Scheduling"),
+]
+POSITIVE_WORDS = with_inflections("thank", "thankful", "great", "good", "excellent", "happy", "satisfied", "love", "appreciate")
+NEGATIVE_WORDS = with_inflections("bad", "terrible", "awful", "hate", "angry", "frustrated", "disappointed", "poor")
+CALLBACK_WORDS = with_inflections("call back", "callback")
+EMAIL_WORDS = with_inflections("email")
+SEND_WORDS = with_inflections("send", "forward")
+REFUND_WORDS = with_inflections("refund", "return")
+APPOINTMENT_WORDS = with_inflections("appointment", "schedule", "reschedule")
+WORD_RE = re.compile(r"[a-z]+")
+
+# Layout of the analysis text shown in the UI and stored in the database
+ANALYSIS_TEMPLATE = "**Intent:** {intent}\n**Sentiment:** {sentiment}\n**Action Items:**\n{bullets}\n**Summary:** {summary}\n"
+
+# Cache translations; a failed translation raises, so it is retried next time
+@st.cache_data(max_entries=128)
+def translate_to_english(text, source_lang):
+    translator, lock = get_translator(source_lang)
+    with lock:
+        return translator.translate(text)
 
 # Simple rule-based analysis (FREE - no API needed)
 def analyze_transcription_free(text, source_lang='auto'):
@@ -89,34 +187,33 @@ def analyze_transcription_free(text, source_lang='auto'):
         # Handle locale codes like 'en-US', 'hi-IN' -> 'en', 'hi'
         if source_lang != 'auto' and '-' in source_lang:
             source_lang = source_lang.split('-')[0]
-            
-        translator = GoogleTranslator(source=source_lang, target='en')
-        text_en = translator.translate(text)
+        
+        # Already English - no round trip needed
+        if source_lang.startswith('en'):
+            text_en = text
+        else:
+            text_en = translate_to_english(text, source_lang)
     except Exception as e:
         print(f"Translation error: {e}")
         text_en = text
+    
+    return analyze_english_text(text_en)
 
+# Keyword analysis of an English transcript (cached - it is a pure function of the text)
+@st.cache_data(max_entries=128)
+def analyze_english_text(text_en):
     text_lower = text_en.lower()
     
+    # Tokenize once: whole words plus adjacent pairs for the two-word phrases
+    words = WORD_RE.findall(text_lower)
+    tokens = frozenset(words) | frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+    
     # Determine intent based on keywords
-    intent = "General Inquiry"
-    if any(word in text_lower for word in ["buy", "purchase", "order", "price", "cost"]):
-        intent = "Sales/Purchase Inquiry"
-    elif any(word in text_lower for word in ["problem", "issue", "not working", "broken", "fix", "help"]):
-        intent = "Technical Support"
-    elif any(word in text_lower for word in ["cancel", "refund", "return", "complaint"]):
-        intent = "Complaint/Refund Request"
-    elif any(word in text_lower for word in ["information", "details", "tell me", "what is", "how to"]):
-        intent = "Information Request"
-    elif any(word in text_lower for word in ["appointment", "schedule", "book", "meeting"]):
-        intent = "Appointment/Scheduling"
+    intent = next((label for keywords, label in INTENT_SETS if keywords & tokens), "General Inquiry")
     
     # Determine sentiment based on keywords
-    positive_words = ["thank", "great", "good", "excellent", "happy", "satisfied", "love", "appreciate"]
-    negative_words = ["bad", "terrible", "awful", "hate", "angry", "frustrated", "disappointed", "poor"]
-    
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
+    positive_count = len(POSITIVE_WORDS & tokens)
+    negative_count = len(NEGATIVE_WORDS & tokens)
     
     if positive_count > negative_count:
         sentiment = "Positive 😊"
@@ -127,13 +224,13 @@ def analyze_transcription_free(text, source_lang='auto'):
     
     # Extract potential action items
     action_items = []
-    if "call back" in text_lower or "callback" in text_lower:
+    if CALLBACK_WORDS & tokens:
         action_items.append("Schedule callback")
-    if "email" in text_lower and ("send" in text_lower or "forward" in text_lower):
+    if EMAIL_WORDS & tokens and SEND_WORDS & tokens:
         action_items.append("Send email with information")
-    if "refund" in text_lower or "return" in text_lower:
+    if REFUND_WORDS & tokens:
         action_items.append("Process refund/return request")
-    if "appointment" in text_lower or "schedule" in text_lower:
+    if APPOINTMENT_WORDS & tokens:
         action_items.append("Schedule appointment")
     if not action_items:
         action_items.append("Follow up with customer")
@@ -145,18 +242,87 @@ def analyze_transcription_free(text, source_lang='auto'):
         summary = text_en
     
     # Format the analysis
-    analysis = f"""**Intent:** {intent}
-**Sentiment:** {sentiment}
-**Action Items:**
-{chr(10).join(f"- {item}" for item in action_items)}
-**Summary:** {summary}
-"""
+    bullets = "\n".join([f"- {item}" for item in action_items])
+    analysis = ANALYSIS_TEMPLATE.format(intent=intent, sentiment=sentiment, bullets=bullets, summary=summary)
     
     return analysis
 
+# Transcribe on the worker pool, showing partial text as segments arrive, then analyze
+def process_audio(audio_bytes, language):
+    partial = []
+    preview = st.empty()
+    audio_sha = hashlib.sha256(audio_bytes).hexdigest()
+    future = EXECUTOR.submit(_transcribe_cached, audio_sha, language, audio_bytes, partial.append)
+    shown = 0
+    while not future.done():
+        if len(partial) != shown:
+            shown = len(partial)
+            preview.info(" ".join(partial))
+        time.sleep(0.1)
+    preview.empty()
+    
+    try:
+        transcription = future.result()
+    except Exception as e:
+        transcription = f"Transcription error: {str(e)}"
+    analysis = None
+    if transcription:
+        analysis = analyze_transcription_free(transcription, source_lang=language)
+    return transcription, analysis
+
+# Write-behind queue: saves are batched into multi-row inserts by a background thread
+WRITE_BATCH_SIZE = 16
+WRITE_FLUSH_INTERVAL = 1.0
+WRITE_MAX_ATTEMPTS = 5  # failed rows are re-queued until they have failed this many times
+
+def _insert_rows(supabase, rows):
+    try:
+        result = supabase.table("call_records").insert(rows).execute()
+        print(f"[DEBUG] Saved {len(rows)} record(s)! Result: {result}")  # Debug log
+        return True
+    except Exception as e:
+        print(f"[ERROR] ❌ Database error saving {len(rows)} record(s): {repr(e)}")
+        return False
+
+# Queue items are (failed attempts, row) pairs
+@st.cache_resource
+def get_write_queue(_supabase):
+    write_q = queue.Queue()
+    
+    def flush():
+        while True:
+            items = []
+            while len(items) < WRITE_BATCH_SIZE:
+                try:
+                    items.append(write_q.get_nowait())
+                except queue.Empty:
+                    break
+            if not items:
+                return
+            if not _insert_rows(_supabase, [row for _, row in items]):
+                # Put the rows back for the next flush
+                for attempts, row in items:
+                    if attempts + 1 < WRITE_MAX_ATTEMPTS:
+                        write_q.put((attempts + 1, row))
+                    # Out of batch attempts: insert it alone so one bad row can't sink the rest
+                    elif not _insert_rows(_supabase, [row]):
+                        print(f"[ERROR] ❌ Giving up on record {row['filename']} after {WRITE_MAX_ATTEMPTS} attempts")
+                return
+    
+    def writer():
+        while True:
+            time.sleep(WRITE_FLUSH_INTERVAL)
+            flush()
+    
+    threading.Thread(target=writer, daemon=True).start()
+    atexit.register(flush)
+    return write_q, flush
+
 # Save to Supabase
 def save_to_database(supabase, filename, transcription, analysis, language="en-US"):
     try:
+        if supabase is None:
+            raise RuntimeError("Supabase client is not configured")
         data = {
             "timestamp": datetime.now().isoformat(),
             "filename": filename,
@@ -164,9 +330,9 @@ def save_to_database(supabase, filename, transcription, analysis, language="en-U
             "analysis": analysis,
             "language": language
         }
-        print(f"[DEBUG] Attempting to save data: {data}")  # Debug log
-        result = supabase.table("call_records").insert(data).execute()
-        print(f"[DEBUG] Save successful! Result: {result}")  # Debug log
+        print(f"[DEBUG] Queueing data for save: {data}")  # Debug log
+        write_q, _ = get_write_queue(supabase)
+        write_q.put((0, data))
         return True
     except Exception as e:
         error_msg = f"❌ Database error: {str(e)}"
@@ -176,15 +342,76 @@ def save_to_database(supabase, filename, transcription, analysis, language="en-U
         st.error(f"Detailed error: {repr(e)}")  # Show detailed error in UI
         return False
 
-# Load all records from database
-def load_records(supabase):
+# Records are listed one page at a time, fetching only the columns shown
+RECORDS_PAGE_SIZE = 50
+RECORD_COLUMNS = "id,filename,timestamp,transcribed_text,analysis"
+
+# Load call statistics aggregated server-side (see call_stats() in the Setup page SQL)
+def load_call_stats(supabase):
     try:
-        response = supabase.table("call_records").select("*").order("timestamp", desc=True).execute()
+        # Make sure queued saves are counted
+        _, flush = get_write_queue(supabase)
+        flush()
+        day_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        response = supabase.rpc("call_stats", {"day_start": day_start}).execute()
+        return response.data
+    except Exception as e:
+        st.warning(f"⚠️ Call statistics unavailable (create call_stats() from the Setup page): {str(e)}")
+        return None
+
+# Quote a search term for a PostgREST ilike filter, matching it as a substring.
+# PostgREST turns every * into % and has no escape for it, so a * in the term is
+# searched as the single-character wildcard _ (which still matches a literal *).
+def ilike_pattern(term):
+    term = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")  # LIKE wildcards
+    term = term.replace("*", "_")
+    term = term.replace("\\", "\\\\").replace('"', '\\"')  # PostgREST quoting
+    return f'"*{term}*"'
+
+# Apply the search box and date filter to a call_records query (date is a UTC day)
+def filter_records(query, search_term=None, date_filter=None):
+    if search_term:
+        pattern = ilike_pattern(search_term)
+        query = query.or_(f"transcribed_text.ilike.{pattern},analysis.ilike.{pattern}")
+    if date_filter:
+        day_start = datetime(date_filter.year, date_filter.month, date_filter.day, tzinfo=timezone.utc)
+        query = query.gte("timestamp", day_start.isoformat()).lt("timestamp", (day_start + timedelta(days=1)).isoformat())
+    return query
+
+# Count the records matching the filters
+def count_records(supabase, search_term=None, date_filter=None):
+    try:
+        query = supabase.table("call_records").select("id", count="exact").limit(1)
+        return filter_records(query, search_term, date_filter).execute().count or 0
+    except Exception as e:
+        st.error(f"❌ Error counting records: {str(e)}")
+        return 0
+
+# Load one page of the records matching the filters
+def load_records(supabase, page=0, search_term=None, date_filter=None):
+    try:
+        # Make sure queued saves are visible before reading
+        _, flush = get_write_queue(supabase)
+        flush()
+        start = page * RECORDS_PAGE_SIZE
+        query = filter_records(supabase.table("call_records").select(RECORD_COLUMNS), search_term, date_filter)
+        response = query.order("timestamp", desc=True).range(start, start + RECORDS_PAGE_SIZE - 1).execute()
         return response.data
     except Exception as e:
         st.error(f"❌ Error loading records: {str(e)}")
         return []
 
+# Load every record matching the filters (for the CSV export), page by page
+def load_all_records(supabase, search_term=None, date_filter=None):
+    records = []
+    page = 0
+    while True:
+        batch = load_records(supabase, page, search_term, date_filter)
+        records.extend(batch)
+        if len(batch) < RECORDS_PAGE_SIZE:
+            return records
+        page += 1
+
 # Delete record from database and local storage
 def delete_record(supabase, record_id, filename):
     try:
@@ -202,9 +429,7 @@ def delete_record(supabase, record_id, filename):
         return False
 
 # Custom CSS for professional styling
-def local_css():
-    st.markdown(
-        """
+CUSTOM_CSS = """
         <style>
         @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
         
@@ -449,9 +674,10 @@ def local_css():
             gap: 0.5rem;
         }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+def local_css():
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Main app
 def main():
@@ -543,20 +769,9 @@ def main():
                         
                         if st.button("⚡ Convert to Text", type="primary", use_container_width=True):
                             with st.spinner("🔄 Transcribing..."):
-                                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode='wb') as tmp_file:
-                                    tmp_file.write(audio_bytes)
-                                    tmp_file_path = tmp_file.name
-                                
-                                try:
-                                    # Use configured default language
-                                    default_lang = os.getenv("DEFAULT_LANGUAGE", "en-US")
-                                    st.session_state.transcription = transcribe_audio_free(tmp_file_path, language=default_lang)
-                                    st.session_state.filename = f"call_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-                                    if st.session_state.transcription:
-                                        st.session_state.analysis = analyze_transcription_free(st.session_state.transcription, source_lang=default_lang)
-                                finally:
-                                    if os.path.exists(tmp_file_path):
-                                        os.unlink(tmp_file_path)
+                                # Use configured default language
+                                st.session_state.transcription, st.session_state.analysis = process_audio(audio_bytes, DEFAULT_LANGUAGE)
+                                st.session_state.filename = f"call_{datetime.now().strftime('%Y%m%d_%H%M%S')}.opus"
 
                 elif input_method == "📁 Upload Audio File":
                     uploaded_file = st.file_uploader(
@@ -565,44 +780,14 @@ def main():
                     )
                     
                     if uploaded_file:
-                        st.audio(uploaded_file, format=f"audio/{uploaded_file.type.split('/')[-1]}")
+                        # One shared buffer for playback, transcription and saving
+                        payload = uploaded_file.getvalue()
+                        st.audio(payload, format=f"audio/{uploaded_file.type.split('/')[-1]}")
                         
                         if st.button("⚡ Process File", type="primary", use_container_width=True):
                             with st.spinner("🔄 Transcribing..."):
-                                # Save uploaded file to temp file
-                                file_ext = uploaded_file.name.split('.')[-1].lower()
-                                with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as tmp_file:
-                                    tmp_file.write(uploaded_file.read())
-                                    tmp_file_path = tmp_file.name
-                                
-                                converted_wav_path = None
-                                transcription_file_path = tmp_file_path
-                                
-                                try:
-                                    # Convert to WAV if needed
-                                    if file_ext != "wav":
-                                        try:
-                                            audio = AudioSegment.from_file(tmp_file_path)
-                                            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as wav_file:
-                                                audio.export(wav_file.name, format="wav")
-                                                converted_wav_path = wav_file.name
-                                            
-                                            # Use the converted file for transcription
-                                            transcription_file_path = converted_wav_path
-                                        except Exception as e:
-                                            st.error(f"⚠️ Error converting audio: {str(e)}")
-                                    
-                                    default_lang = os.getenv("DEFAULT_LANGUAGE", "en-US")
-                                    st.session_state.transcription = transcribe_audio_free(transcription_file_path, language=default_lang)
-                                    st.session_state.filename = uploaded_file.name
-                                    if st.session_state.transcription:
-                                        st.session_state.analysis = analyze_transcription_free(st.session_state.transcription, source_lang=default_lang)
-                                finally:
-                                    # Cleanup
-                                    if os.path.exists(tmp_file_path):
-                                        os.unlink(tmp_file_path)
-                                    if converted_wav_path and os.path.exists(converted_wav_path):
-                                        os.unlink(converted_wav_path)
+                                st.session_state.transcription, st.session_state.analysis = process_audio(payload, DEFAULT_LANGUAGE)
+                                st.session_state.filename = uploaded_file.name
 
             
         
@@ -622,20 +807,13 @@ def main():
             
             with col2:
                 if not st.session_state.analysis:
-                    st.session_state.analysis = analyze_transcription_free(st.session_state.transcription)
+                    st.session_state.analysis = analyze_transcription_free(st.session_state.transcription, source_lang=DEFAULT_LANGUAGE)
                 
                 # Format for HTML display
                 # 1. Escape HTML special chars to prevent injection (basic)
                 analysis_text = st.session_state.analysis.replace("<", "&lt;").replace(">", "&gt;")
-                # 2. Convert **Bold** to <strong>Bold</strong>
-                # Simple replacement for the specific format used in analysis
-                analysis_html = analysis_text.replace("**", "<strong>", 1).replace("**", "</strong>", 1) # Intent
-                analysis_html = analysis_html.replace("**", "<strong>", 1).replace("**", "</strong>", 1) # Sentiment
-                analysis_html = analysis_html.replace("**", "<strong>", 1).replace("**", "</strong>", 1) # Action Items
-                analysis_html = analysis_html.replace("**", "<strong>", 1).replace("**", "</strong>", 1) # Summary
-                # Handle any remaining pairs just in case
-                while "**" in analysis_html:
-                    analysis_html = analysis_html.replace("**", "<strong>", 1).replace("**", "</strong>", 1)
+                # 2. Convert **Bold** to <strong>Bold</strong> in a single pass
+                analysis_html = BOLD_RE.sub(r"<strong>\1</strong>", analysis_text)
                 
                 # 3. Convert newlines to <br>
                 analysis_html = analysis_html.replace("\n", "<br>")
@@ -643,6 +821,13 @@ def main():
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 if st.button("💾 Save to Database", type="primary", use_container_width=True):
+                    # Insert the record before the audio lands in C:/CallRecordings, so the
+                    # folder watcher finds it and doesn't transcribe the file a second time
+                    saved = save_to_database(supabase, st.session_state.filename, st.session_state.transcription, st.session_state.analysis, st.session_state.language)
+                    if saved:
+                        _, flush = get_write_queue(supabase)
+                        flush()
+                    
                     # Save audio file to C:/CallRecordings if it exists
                     audio_saved = False
                     try:
@@ -654,14 +839,15 @@ def main():
                         
                         # Handle recording vs upload vs text
                         if input_method == "🎙️ Record Voice" and 'audio_bytes' in locals():
-                            with open(save_path, "wb") as f:
-                                f.write(audio_bytes)
+                            # Store recordings as 24 kbps voice Opus (~10x smaller than the raw WAV)
+                            recording = AudioSegment.from_file(io.BytesIO(audio_bytes), format="wav")
+                            recording.set_channels(1).set_frame_rate(16000).export(
+                                save_path, format="opus", bitrate="24k", parameters=["-application", "voip"]
+                            )
                             audio_saved = True
-                        elif input_method == "📁 Upload Audio File" and 'uploaded_file' in locals():
-                            # Reset pointer
-                            uploaded_file.seek(0)
+                        elif input_method == "📁 Upload Audio File" and 'payload' in locals():
                             with open(save_path, "wb") as f:
-                                f.write(uploaded_file.read())
+                                f.write(payload)
                             audio_saved = True
                             
                         if audio_saved:
@@ -669,7 +855,7 @@ def main():
                     except Exception as e:
                         print(f"[APP] Error saving audio file: {e}")
 
-                    if save_to_database(supabase, st.session_state.filename, st.session_state.transcription, st.session_state.analysis, st.session_state.language):
+                    if saved:
                         st.success("✅ Step 3 Complete: Successfully stored in database!")
                         if audio_saved:
                             st.info(f"📁 Audio file saved to: C:/CallRecordings/{st.session_state.filename}")
@@ -687,56 +873,63 @@ def main():
     elif page == "📊 View Records":
         st.markdown("## 📊 Call History")
         
-        # Load records
-        records = load_records(supabase)
+        # Aggregates are computed by the database, not from the loaded rows.
+        # Without call_stats() (older setups) only the total is shown, but records still list.
+        stats = load_call_stats(supabase)
+        total = stats["total"] if stats else count_records(supabase)
         
-        if not records:
+        if not total:
             st.info("📭 No records found. Start by answering a call on the 'Answer Call' page.")
             return
         
-        # Convert to DataFrame
-        df = pd.DataFrame(records)
-        
         # Stats Cards
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("📞 Total Calls", len(df))
-        with col2:
-            today_calls = len(df[pd.to_datetime(df['timestamp']).dt.date == datetime.now().date()])
-            st.metric("📅 Today's Calls", today_calls)
-        with col3:
-            avg_length = df['transcribed_text'].str.len().mean()
-            st.metric("📏 Avg Length", f"{int(avg_length)} chars")
+            st.metric("📞 Total Calls", total)
+        if stats:
+            with col2:
+                st.metric("📅 Today's Calls", stats["today"])
+            with col3:
+                st.metric("📏 Avg Length", f"{int(stats['avg_length'])} chars")
         
         st.markdown("---")
         
         # Search and filter
-        col1, col2 = st.columns([3, 1])
+        col1, col2, col3 = st.columns([3, 1, 1])
         with col1:
             search_term = st.text_input("🔍 Search", placeholder="Search by keyword, intent, or content...")
         with col2:
             date_filter = st.date_input("📅 Date", value=None)
         
-        # Apply filters
-        filtered_df = df.copy()
-        if search_term:
-            filtered_df = filtered_df[
-                filtered_df['transcribed_text'].str.contains(search_term, case=False, na=False) |
-                filtered_df['analysis'].str.contains(search_term, case=False, na=False)
-            ]
+        # Filters run in the database, so they cover every record, not just one page
+        if search_term or date_filter:
+            match_count = count_records(supabase, search_term, date_filter)
+        else:
+            match_count = total
+        with col3:
+            page_count = max(1, -(-match_count // RECORDS_PAGE_SIZE))
+            page_number = st.number_input("📄 Page", min_value=1, max_value=page_count, value=1)
+        
+        # Load the matching records for the selected page
+        records = load_records(supabase, page_number - 1, search_term, date_filter)
+        
+        st.markdown(f"### 📋 Recent Calls ({match_count})")
         
-        if date_filter:
-            filtered_df = filtered_df[pd.to_datetime(filtered_df['timestamp']).dt.date == date_filter]
+        if not records:
+            st.info("📭 No matching records.")
+            return
+        
+        filtered_df = pd.DataFrame(records)
         
-        st.markdown(f"### 📋 Recent Calls ({len(filtered_df)})")
+        # Check which recordings exist locally with a single directory listing
+        existing_files = {entry.name for entry in os.scandir("C:/CallRecordings")} if os.path.isdir("C:/CallRecordings") else set()
+        filtered_df = filtered_df.assign(has_audio=filtered_df['filename'].isin(existing_files))
         
         # Display records
-        for idx, record in filtered_df.iterrows():
+        for record in filtered_df.to_dict("records"):
             with st.expander(f"📞 {record['filename']} - {record['timestamp'][:16]}"):
-                # Check if audio file exists locally
-                local_audio_path = os.path.join("C:/CallRecordings", record['filename'])
-                if os.path.exists(local_audio_path):
-                    st.audio(local_audio_path)
+                if record['has_audio']:
+                    st.audio(os.path.join("C:/CallRecordings", record['filename']))
                 
                 col1, col2 = st.columns(2)
                 
@@ -757,7 +950,7 @@ def main():
         # Download option
         st.divider()
         if st.button("📥 Export All Records to CSV"):
-            csv = filtered_df.to_csv(index=False)
+            csv = pd.DataFrame(load_all_records(supabase, search_term, date_filter)).to_csv(index=False)
             st.download_button(
                 label="⬇️ Download CSV File",
                 data=csv,
@@ -774,7 +967,7 @@ def main():
         
         This application utilizes a robust stack of technologies to provide seamless call processing and analysis:
         
-        *   **Speech-to-Text Engine**: Google Speech Recognition for accurate voice transcription.
+        *   **Speech-to-Text Engine**: Local faster-whisper model for accurate voice transcription.
         *   **Analysis Engine**: Local rule-based processing for intent detection and sentiment analysis.
         *   **Database**: Supabase (PostgreSQL) for secure and scalable record storage.
         
@@ -798,6 +991,18 @@ def main():
         );
         
         CREATE INDEX IF NOT EXISTS idx_call_records_timestamp ON call_records(timestamp DESC);
+        
+        CREATE OR REPLACE FUNCTION call_stats(day_start TIMESTAMPTZ)
+        RETURNS JSON
+        LANGUAGE SQL STABLE
+        AS $$
+            SELECT json_build_object(
+                'total', COUNT(*),
+                'today', COUNT(*) FILTER (WHERE timestamp >= day_start),
+                'avg_length', COALESCE(AVG(char_length(transcribed_text)), 0)
+            )
+            FROM call_records;
+        $$;
         ```
         
         ### 📝 Workflow
@@ -821,7 +1026,7 @@ def main():
         
         with col1:
             st.success("✅ Speech Services: Active")
-            st.info("Google Speech Recognition Ready")
+            st.info("faster-whisper Speech Recognition Ready")
         
         with col2:
             if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"):
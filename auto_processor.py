@@ -1,5 +1,14 @@
 import os
+import sys
+import json
+import re
 import time
+import hashlib
+import functools
+import types
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from datetime import datetime
@@ -7,7 +16,11 @@ from dotenv import load_dotenv
 from supabase import create_client
 import speech_recognition as sr
 from pydub import AudioSegment
+import httpx
+import requests
+import deep_translator.google
 from deep_translator import GoogleTranslator
+from langdetect import detect, DetectorFactory
 
 # Load environment variables
 load_dotenv()
@@ -17,39 +30,74 @@ supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
 supabase = create_client(supabase_url, supabase_key)
 
+# Replace PostgREST's default session with an explicit keep-alive HTTP/2 pool so
+# every select/insert/delete reuses the same TLS connection
+_postgrest_session = supabase.postgrest.session
+supabase.postgrest.session = httpx.Client(
+    base_url=_postgrest_session.base_url,
+    headers=_postgrest_session.headers,
+    timeout=30,
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,  # retry failed connection attempts
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60),
+    ),
+)
+_postgrest_session.close()
+
 # Default language for transcription
 DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en-US")
-print(f"🌍 Default Language: {DEFAULT_LANGUAGE}")
 
 # Folder to monitor
 WATCH_FOLDER = "C:/CallRecordings"  # You can change this path
 
-print("=" * 60)
-print("🎙️ AUTOMATIC CALL RECORDER PROCESSOR")
-print("=" * 60)
-print(f"📁 Watching folder: {WATCH_FOLDER}")
-print("=" * 60)
+# Audio files the watcher handles (.opus is what the web app saves recordings as)
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.m4a', '.ogg', '.webm', '.opus'})
+
+# Shared speech/translation clients, reused for every file
+RECOGNIZER = sr.Recognizer()
+TRANSLATOR = GoogleTranslator(source='auto', target='en')
+translator_lock = threading.Lock()  # translate() mutates the instance's request params
+
+# deep_translator calls requests.get() per translation; route it through one keep-alive session
+HTTP_SESSION = requests.Session()
+deep_translator.google.requests = types.SimpleNamespace(get=HTTP_SESSION.get)
+
+# Audio loading
+def _decode_to_pcm(audio_file_path):
+    """Decode a recording to 16 kHz mono 16-bit PCM bytes (runs in the decode process pool)"""
+    audio = AudioSegment.from_file(audio_file_path)
+    audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+    return audio.raw_data
+
+def load_audio_data(audio_file_path, decode_pool=None):
+    """Load a recording for the recognizer, only going through pydub/ffmpeg when needed"""
+    # PCM WAV can be read directly - no ffmpeg subprocess or re-encode
+    if os.path.splitext(audio_file_path)[1].lower() == '.wav':
+        try:
+            with sr.AudioFile(audio_file_path) as source:
+                return RECOGNIZER.record(source)
+        except ValueError:
+            pass  # Not PCM WAV (e.g. compressed) - fall back to ffmpeg below
+    
+    # Decode in memory (no temporary WAV on disk); in a separate process when a pool
+    # is given so the resampling doesn't hold this process's GIL
+    if decode_pool is not None:
+        raw_data = decode_pool.submit(_decode_to_pcm, audio_file_path).result()
+    else:
+        raw_data = _decode_to_pcm(audio_file_path)
+    return sr.AudioData(raw_data, 16000, 2)
 
 # Transcription function
-def transcribe_audio_free(audio_file_path):
-    """Transcribe audio using free Google Speech Recognition"""
+def transcribe_audio_free(audio_file_path, decode_pool=None, audio_data=None):
+    """Transcribe audio using free Google Speech Recognition (audio_data: the recording, if already loaded)"""
     try:
-        recognizer = sr.Recognizer()
-        
-        print(f"[TRANSCRIBE] Converting: {os.path.basename(audio_file_path)}")
-        # Convert audio to WAV format if needed
-        audio = AudioSegment.from_file(audio_file_path)
-        wav_path = audio_file_path.replace(audio_file_path.split('.')[-1], 'wav')
-        audio.export(wav_path, format='wav')
+        if audio_data is None:
+            print(f"[TRANSCRIBE] Converting: {os.path.basename(audio_file_path)}")
+            audio_data = load_audio_data(audio_file_path, decode_pool)
         
         # Transcribe using Google Speech Recognition (FREE)
-        with sr.AudioFile(wav_path) as source:
-            audio_data = recognizer.record(source)
-            text = recognizer.recognize_google(audio_data, language=DEFAULT_LANGUAGE)
-        
-        # Clean up temporary wav file
-        if wav_path != audio_file_path and os.path.exists(wav_path):
-            os.unlink(wav_path)
+        text = RECOGNIZER.recognize_google(audio_data, language=DEFAULT_LANGUAGE)
         
         print(f"[TRANSCRIBE] Success! Text: {text[:100]}...")
         return text
@@ -63,39 +111,96 @@ def transcribe_audio_free(audio_file_path):
         print(f"[TRANSCRIBE] ERROR: {str(e)}")
         return f"Error: {str(e)}"
 
+def with_inflections(*words):
+    """Keyword set with the plural, -ed and -ing forms of each single word added, so whole-token
+    matching still catches what substring matching did ("problems", "booked", "refunded", "loved")"""
+    forms = set(words)
+    for word in words:
+        if " " not in word:
+            stem = word[:-1] if word.endswith("e") else word
+            forms.update((word + "s", word + "es", stem + "ed", stem + "ing"))
+    return frozenset(forms)
+
+# Keyword sets for the analysis (intents are checked in order).
+# Two-word phrases are matched against adjacent word pairs.
+INTENT_KEYWORDS: dict[str, frozenset[str]] = {
+    "Sales/Purchase Inquiry": with_inflections("buy", "purchase", "order", "price", "cost"),
+    "Technical Support": with_inflections("problem", "issue", "not working", "broken", "fix", "help"),
+    "Complaint/Refund Request": with_inflections("cancel", "cancelled", "cancelling", "cancellation", "refund", "return", "complaint"),
+    "Information Request": with_inflections("information", "details", "tell me", "what is", "how to"),
+    "Appointment/Scheduling": with_inflections("appointment", "schedule", "reschedule", "book", "meeting"),
+}
+POSITIVE = with_inflections("thank", "thankful", "great", "good", "excellent", "happy", "satisfied", "love", "appreciate")
+NEGATIVE = with_inflections("bad", "terrible", "awful", "hate", "angry", "frustrated", "disappointed", "poor")
+CALLBACK = with_inflections("call back", "callback")
+EMAIL = with_inflections("email")
+SEND = with_inflections("send", "forward")
+REFUND = with_inflections("refund", "return")
+APPOINTMENT = with_inflections("appointment", "schedule", "reschedule")
+WORD_RE = re.compile(r"[a-z]+(?:'[a-z]+)*")  # words, keeping inner apostrophes (don't)
+
+# Layout of the analysis text stored in the database
+ANALYSIS_TEMPLATE = "**Intent:** {intent}\n**Sentiment:** {sentiment}\n**Action Items:**\n{bullets}\n**Summary:** {summary}\n\n*Processed automatically by folder watcher*\n"
+
+# Translations keyed by a 16-byte digest of the transcript (least recently used evicted first)
+TRANSLATION_CACHE_SIZE = 1024
+translation_cache = OrderedDict()
+translation_lock = threading.Lock()
+
+# Make langdetect deterministic
+DetectorFactory.seed = 0
+
+def translate_to_english(text, source_lang='auto'):
+    """Translate text to English, skipping English input and repeated transcripts"""
+    # Transcribed in English already - nothing to detect or translate
+    if source_lang.lower().startswith('en'):
+        return text
+    
+    key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    with translation_lock:
+        if key in translation_cache:
+            translation_cache.move_to_end(key)
+            return translation_cache[key]
+    
+    try:
+        # Detect locally first - English needs no network round trip
+        if detect(text) == 'en':
+            text_en = text
+        else:
+            # Always use 'auto' to detect the language automatically
+            with translator_lock:
+                text_en = TRANSLATOR.translate(text)
+    except Exception as e:
+        # Not cached, so a transient failure is retried next time
+        print(f"Translation error: {e}")
+        return text
+    
+    with translation_lock:
+        translation_cache[key] = text_en
+        if len(translation_cache) > TRANSLATION_CACHE_SIZE:
+            translation_cache.popitem(last=False)
+    return text_en
+
 # Analysis function
 def analyze_transcription_free(text, source_lang='auto'):
     """Free analysis using keyword matching"""
     # Translate to English for analysis
-    # Always use 'auto' to detect the language automatically
-    try:
-        translator = GoogleTranslator(source='auto', target='en')
-        text_en = translator.translate(text)
-    except Exception as e:
-        print(f"Translation error: {e}")
-        text_en = text
+    return analyze_english_text(translate_to_english(text, source_lang))
 
-    text_lower = text_en.lower()
+@functools.lru_cache(maxsize=1024)
+def analyze_english_text(text_en):
+    """Keyword analysis of an English transcript (cached - it is a pure function of the text)"""
+    # Tokenize once: whole words plus adjacent pairs for the two-word phrases
+    words = WORD_RE.findall(text_en.lower())
+    tokens = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
     
     # Determine intent
-    intent = "General Inquiry"
-    if any(word in text_lower for word in ["buy", "purchase", "order", "price", "cost"]):
-        intent = "Sales/Purchase Inquiry"
-    elif any(word in text_lower for word in ["problem", "issue", "not working", "broken", "fix", "help"]):
-        intent = "Technical Support"
-    elif any(word in text_lower for word in ["cancel", "refund", "return", "complaint"]):
-        intent = "Complaint/Refund Request"
-    elif any(word in text_lower for word in ["information", "details", "tell me", "what is", "how to"]):
-        intent = "Information Request"
-    elif any(word in text_lower for word in ["appointment", "schedule", "book", "meeting"]):
-        intent = "Appointment/Scheduling"
-    
-    # Determine sentiment
-    positive_words = ["thank", "great", "good", "excellent", "happy", "satisfied", "love", "appreciate"]
-    negative_words = ["bad", "terrible", "awful", "hate", "angry", "frustrated", "disappointed", "poor"]
+    intent = next((label for label, keywords in INTENT_KEYWORDS.items() if keywords & tokens), "General Inquiry")
     
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
+    # Determine sentiment from word frequencies (every occurrence counts)
+    word_counts = Counter(words)
+    positive_count = sum(word_counts[word] for word in POSITIVE)
+    negative_count = sum(word_counts[word] for word in NEGATIVE)
     
     if positive_count > negative_count:
         sentiment = "Positive 😊"
@@ -106,13 +211,13 @@ def analyze_transcription_free(text, source_lang='auto'):
     
     # Extract action items
     action_items = []
-    if "call back" in text_lower or "callback" in text_lower:
+    if CALLBACK & tokens:
         action_items.append("Schedule callback")
-    if "email" in text_lower and ("send" in text_lower or "forward" in text_lower):
+    if EMAIL & tokens and SEND & tokens:
         action_items.append("Send email with information")
-    if "refund" in text_lower or "return" in text_lower:
+    if REFUND & tokens:
         action_items.append("Process refund/return request")
-    if "appointment" in text_lower or "schedule" in text_lower:
+    if APPOINTMENT & tokens:
         action_items.append("Schedule appointment")
     if not action_items:
         action_items.append("Follow up with customer")
@@ -124,20 +229,71 @@ def analyze_transcription_free(text, source_lang='auto'):
         summary = text_en
     
     # Format analysis
-    analysis = f"""**Intent:** {intent}
-**Sentiment:** {sentiment}
-**Action Items:**
-{chr(10).join(f"- {item}" for item in action_items)}
-**Summary:** {summary}
-
-*Processed automatically by folder watcher*
-"""
+    bullets = "\n".join(f"- {item}" for item in action_items)
+    analysis = ANALYSIS_TEMPLATE.format(intent=intent, sentiment=sentiment, bullets=bullets, summary=summary)
     
     return analysis
 
+# Records waiting to be inserted; flushed to Supabase in batches by a timer
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 2  # seconds
+MAX_SAVE_ATTEMPTS = 5  # failed inserts are retried on later flushes, then given up
+pending_records = deque()  # (failed attempts, record) pairs
+pending_lock = threading.Lock()
+
+def insert_record(record):
+    """Insert a single call record, returning whether it was saved"""
+    try:
+        supabase.table("call_records").insert(record).execute()
+        return True
+    except Exception as e:
+        print(f"[DATABASE] ❌ ERROR saving {record['filename']}: {str(e)}")
+        return False
+
+def flush_records(on_dropped=None):
+    """Insert all queued call records, up to BATCH_SIZE rows per request.
+    A failed batch goes back to the front of the queue for the next flush; records
+    that fail MAX_SAVE_ATTEMPTS times are passed to on_dropped"""
+    while True:
+        with pending_lock:
+            batch = [pending_records.popleft() for _ in range(min(BATCH_SIZE, len(pending_records)))]
+        if not batch:
+            return
+        try:
+            print(f"[DATABASE] Saving batch of {len(batch)} record(s)")
+            supabase.table("call_records").insert([record for _, record in batch]).execute()
+            print(f"[DATABASE] ✅ Saved successfully!")
+        except Exception as e:
+            print(f"[DATABASE] ❌ ERROR: {str(e)}")
+            retry = [(attempts + 1, record) for attempts, record in batch if attempts + 1 < MAX_SAVE_ATTEMPTS]
+            last_try = [record for attempts, record in batch if attempts + 1 >= MAX_SAVE_ATTEMPTS]
+            with pending_lock:
+                pending_records.extendleft(reversed(retry))
+            # Out of batch attempts: insert one at a time so only rows that fail themselves are lost
+            dropped = [record for record in last_try if not insert_record(record)]
+            if dropped:
+                print(f"[DATABASE] ❌ Giving up on {len(dropped)} record(s) after {MAX_SAVE_ATTEMPTS} attempts")
+                if on_dropped:
+                    on_dropped(dropped)
+            return  # Try again on the next flush
+
+def start_flush_timer(on_dropped=None):
+    """Flush queued records every FLUSH_INTERVAL seconds in the background"""
+    def tick():
+        flush_records(on_dropped)
+        start_flush_timer(on_dropped)
+    timer = threading.Timer(FLUSH_INTERVAL, tick)
+    timer.daemon = True
+    timer.start()
+
+def in_database(filename):
+    """Check whether call_records already has a row for this filename"""
+    existing = supabase.table("call_records").select("id").eq("filename", filename).limit(1).execute()
+    return bool(existing.data)
+
 # Save to database
 def save_to_database(filename, transcription, analysis):
-    """Save call record to Supabase database"""
+    """Queue call record for the next batched insert into Supabase"""
     try:
         data = {
             "timestamp": datetime.now().isoformat(),
@@ -145,78 +301,200 @@ def save_to_database(filename, transcription, analysis):
             "transcribed_text": transcription,
             "analysis": analysis
         }
-        print(f"[DATABASE] Saving: {filename}")
-        result = supabase.table("call_records").insert(data).execute()
-        print(f"[DATABASE] ✅ Saved successfully!")
+        print(f"[DATABASE] Queued: {filename}")
+        with pending_lock:
+            pending_records.append((0, data))
         return True
     except Exception as e:
         print(f"[DATABASE] ❌ ERROR: {str(e)}")
         return False
 
+# Snapshot of processed base filenames, so a restart doesn't need the network
+PROCESSED_FILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "processed_files.json")
+SEED_PAGE_SIZE = 1000  # rows requested per page when seeding it from the database
+
+def wait_until_written(filepath, interval=0.05, max_polls=40):
+    """Return as soon as the file is non-empty and its size stops changing (at most ~2 seconds)"""
+    previous_size = -1
+    for _ in range(max_polls):
+        size = os.path.getsize(filepath)
+        if size == previous_size and size > 0:
+            return
+        previous_size = size
+        time.sleep(interval)
+
+# Only the Linux (inotify) observer reports when a writer closes a file
+CLOSE_EVENTS_SUPPORTED = sys.platform.startswith("linux")
+CLOSE_WAIT_INTERVAL = 2  # seconds without growth before a file with no close event counts as written
+
+def wait_for_close(filepath, closed, interval=CLOSE_WAIT_INTERVAL):
+    """Wait until on_closed sets closed. Files moved into the folder never get a close
+    event, so also return once the size has not changed for a whole interval"""
+    previous_size = os.path.getsize(filepath)
+    while not closed.wait(interval):
+        size = os.path.getsize(filepath)
+        if size == previous_size and size > 0:
+            return
+        previous_size = size
+
 # File system event handler
 class AudioFileHandler(FileSystemEventHandler):
-    def __init__(self):
+    def __init__(self, decode_pool=None):
         self.processing = set()  # Track files being processed
         self.processed_files = set()  # Track already processed files (avoid duplicates)
+        self.close_events = {}  # Path -> Event set by on_closed, for files queued by on_created (Linux)
+        self.lock = threading.Lock()  # Guards the sets and close_events across worker threads
+        self.pool = ThreadPoolExecutor(max_workers=8)  # Files are processed concurrently
+        self.decode_pool = decode_pool  # Optional process pool for CPU-bound audio decoding
+        self.io_pool = ThreadPoolExecutor(max_workers=4)  # Database lookups that overlap decoding
+        self.load_processed_files()
+    
+    def load_processed_files(self):
+        """Restore processed_files from disk, or seed it from the database on first run"""
+        if os.path.exists(PROCESSED_FILES_PATH):
+            try:
+                with open(PROCESSED_FILES_PATH, "r", encoding="utf-8") as f:
+                    names = json.load(f)
+                with self.lock:
+                    self.processed_files.update(names)
+                print(f"[STATE] Loaded {len(self.processed_files)} already processed file(s) from {PROCESSED_FILES_PATH}")
+                return
+            except (OSError, ValueError) as e:
+                print(f"[STATE] ❌ Could not read {PROCESSED_FILES_PATH}: {str(e)}")
+        
+        try:
+            # PostgREST caps each response (1000 rows by default), so page through the table
+            names = []
+            while True:
+                start = len(names)
+                existing = supabase.table("call_records").select("filename").order("id").range(start, start + SEED_PAGE_SIZE - 1).execute()
+                if not existing.data:
+                    break
+                names.extend(os.path.splitext(row["filename"])[0] for row in existing.data)
+            with self.lock:
+                self.processed_files.update(names)
+                self.save_processed_files()
+            print(f"[DATABASE] Loaded {len(self.processed_files)} already processed file(s)")
+        except Exception as e:
+            print(f"[DATABASE] ❌ Could not load processed files: {str(e)}")
+    
+    def save_processed_files(self):
+        """Write processed_files to disk (caller holds self.lock)"""
+        try:
+            tmp_path = PROCESSED_FILES_PATH + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(sorted(self.processed_files), f)
+            os.replace(tmp_path, PROCESSED_FILES_PATH)
+        except OSError as e:
+            print(f"[STATE] ❌ Could not save {PROCESSED_FILES_PATH}: {str(e)}")
+    
+    def forget_records(self, records):
+        """Unmark files whose records could not be saved, so they are processed again when seen"""
+        with self.lock:
+            self.processed_files.difference_update(os.path.splitext(record["filename"])[0] for record in records)
+            self.save_processed_files()
     
     def on_created(self, event):
-        # Ignore directories
+        # Ignore directories. Files moved into the folder only raise this event (no close
+        # event), so it is handled on every platform; on Linux the queued job then waits
+        # for on_closed rather than guessing from the file size.
         if event.is_directory:
             return
         
-        # Check if it's an audio file
-        filepath = event.src_path
-        ext = os.path.splitext(filepath)[1].lower()
-        
-        if ext not in ['.mp3', '.wav', '.m4a', '.ogg', '.webm']:
+        self.queue_file(event.src_path, wait_for_write=True)
+    
+    def on_closed(self, event):
+        """Writer closed the file (Linux inotify) - it is complete, no need to wait"""
+        # Ignore directories
+        if event.is_directory:
             return
         
-        # Get base filename without extension (to detect duplicates)
-        base_name = os.path.splitext(os.path.basename(filepath))[0]
-        
-        # Skip if we've already processed this base filename
-        if base_name in self.processed_files:
-            print(f"⏭️  Skipping duplicate: {os.path.basename(filepath)} (already processed)")
+        # Release the job on_created queued for this file, if it is waiting
+        with self.lock:
+            closed = self.close_events.get(event.src_path)
+        if closed is not None:
+            closed.set()
             return
         
-        # Avoid processing the same file multiple times
-        if filepath in self.processing:
+        self.queue_file(event.src_path, wait_for_write=False)
+    
+    def queue_file(self, filepath, wait_for_write):
+        """Filter and de-duplicate a new file, then hand it to the worker pool"""
+        # Parse the path once; base name without extension is used to detect duplicates
+        filename = os.path.basename(filepath)
+        base_name, ext = os.path.splitext(filename)
+        
+        # Check if it's an audio file
+        if ext.lower() not in AUDIO_EXTENSIONS:
             return
         
-        self.processing.add(filepath)
+        with self.lock:
+            # Skip if we've already processed this base filename
+            if base_name in self.processed_files:
+                print(f"⏭️  Skipping duplicate: {filename} (already processed)")
+                return
+            
+            # Avoid processing the same file multiple times
+            if filepath in self.processing:
+                return
+            
+            self.processing.add(filepath)
+            if wait_for_write and CLOSE_EVENTS_SUPPORTED:
+                self.close_events[filepath] = threading.Event()
         
+        # Hand off so the watchdog thread is free for the next event
+        self.pool.submit(self.process_file, filepath, filename, base_name, wait_for_write)
+    
+    def process_file(self, filepath, filename, base_name, wait_for_write):
+        """Transcribe, analyze and save one audio file (runs on the worker pool)"""
         print("\n" + "=" * 60)
         print(f"📞 NEW AUDIO FILE DETECTED!")
-        print(f"📁 File: {os.path.basename(filepath)}")
+        print(f"📁 File: {filename}")
         print("=" * 60)
         
-        # Wait a moment for file to be fully written
-        time.sleep(2)
-        
         try:
-            # Check if file already exists in database
-            filename = os.path.basename(filepath)
-            existing = supabase.table("call_records").select("id").eq("filename", filename).execute()
+            # Wait for file to be fully written
+            if wait_for_write:
+                with self.lock:
+                    closed = self.close_events.get(filepath)
+                if closed is not None:
+                    wait_for_close(filepath, closed)
+                else:
+                    wait_until_written(filepath)
+            
+            # Check if file already exists in database (e.g. saved by the web app),
+            # looking it up while the recording decodes
+            existing_future = self.io_pool.submit(in_database, filename)
+            print(f"[TRANSCRIBE] Converting: {filename}")
+            try:
+                audio_data = load_audio_data(filepath, self.decode_pool)
+            except Exception:
+                audio_data = None  # transcribe_audio_free retries the load and reports the error
             
-            if existing.data:
-                print(f"⏭️  Skipping: {filename} (already in database)")
-                self.processed_files.add(base_name)
+            if existing_future.result():
+                self.skip_saved(filename, base_name)
                 return
-
+            
             # Transcribe
-            transcription = transcribe_audio_free(filepath)
+            transcription = transcribe_audio_free(filepath, self.decode_pool, audio_data)
+            
+            # Check again: a record queued elsewhere may have landed while transcribing
+            if in_database(filename):
+                self.skip_saved(filename, base_name)
+                return
             
             # Analyze
             print("[ANALYZE] Analyzing transcription...")
-            analysis = analyze_transcription_free(transcription)
+            analysis = analyze_transcription_free(transcription, source_lang=DEFAULT_LANGUAGE)
             
             # Save to database
-            filename = os.path.basename(filepath)
             success = save_to_database(filename, transcription, analysis)
             
             if success:
                 # Mark this base filename as processed
-                self.processed_files.add(base_name)
+                with self.lock:
+                    self.processed_files.add(base_name)
+                    self.save_processed_files()
                 print("✅ PROCESSING COMPLETE!")
                 print(f"📝 Transcription: {transcription[:100]}...")
                 print("=" * 60 + "\n")
@@ -229,7 +507,16 @@ class AudioFileHandler(FileSystemEventHandler):
             print("=" * 60 + "\n")
         
         finally:
-            self.processing.remove(filepath)
+            with self.lock:
+                self.processing.remove(filepath)
+                self.close_events.pop(filepath, None)
+    
+    def skip_saved(self, filename, base_name):
+        """Mark a file whose record is already in the database as processed"""
+        print(f"⏭️  Skipping: {filename} (already in database)")
+        with self.lock:
+            self.processed_files.add(base_name)
+            self.save_processed_files()
     
     def on_deleted(self, event):
         """Handle file deletion - also delete from database"""
@@ -237,16 +524,14 @@ class AudioFileHandler(FileSystemEventHandler):
         if event.is_directory:
             return
         
-        # Check if it's an audio file
-        filepath = event.src_path
-        ext = os.path.splitext(filepath)[1].lower()
+        # Parse the path once
+        filename = os.path.basename(event.src_path)
+        base_name, ext = os.path.splitext(filename)
         
-        if ext not in ['.mp3', '.wav', '.m4a', '.ogg', '.webm']:
+        # Check if it's an audio file
+        if ext.lower() not in AUDIO_EXTENSIONS:
             return
         
-        filename = os.path.basename(filepath)
-        base_name = os.path.splitext(filename)[0]
-        
         print("\n" + "=" * 60)
         print(f"🗑️  FILE DELETED FROM FOLDER!")
         print(f"📁 File: {filename}")
@@ -258,8 +543,9 @@ class AudioFileHandler(FileSystemEventHandler):
             result = supabase.table("call_records").delete().eq("filename", filename).execute()
             
             # Also remove from processed files set
-            if base_name in self.processed_files:
-                self.processed_files.remove(base_name)
+            with self.lock:
+                self.processed_files.discard(base_name)
+                self.save_processed_files()
             
             print(f"[DATABASE] ✅ Record deleted from database!")
             print("=" * 60 + "\n")
@@ -269,6 +555,13 @@ class AudioFileHandler(FileSystemEventHandler):
             print("=" * 60 + "\n")
 
 def main():
+    print(f"🌍 Default Language: {DEFAULT_LANGUAGE}")
+    print("=" * 60)
+    print("🎙️ AUTOMATIC CALL RECORDER PROCESSOR")
+    print("=" * 60)
+    print(f"📁 Watching folder: {WATCH_FOLDER}")
+    print("=" * 60)
+    
     # Create watch folder if it doesn't exist
     if not os.path.exists(WATCH_FOLDER):
         os.makedirs(WATCH_FOLDER)
@@ -280,11 +573,19 @@ def main():
     print(f"3. View results at: http://localhost:8501")
     print(f"\n🔄 Monitoring for new files... (Press Ctrl+C to stop)\n")
     
+    # Load langdetect's language profiles here, once: its lazy first-call setup
+    # is not thread-safe, and detect() is later called from the worker threads
+    detect("warm up")
+    
+    # Decode MP3/M4A/etc. on all cores; worker threads only wait on the network
+    decode_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    
     # Set up file system observer
-    event_handler = AudioFileHandler()
+    event_handler = AudioFileHandler(decode_pool)
     observer = Observer()
     observer.schedule(event_handler, WATCH_FOLDER, recursive=False)
     observer.start()
+    start_flush_timer(event_handler.forget_records)
     
     try:
         while True:
@@ -294,6 +595,16 @@ def main():
         observer.stop()
     
     observer.join()
+    # Let in-flight files finish, then save anything still queued before exiting
+    event_handler.pool.shutdown(wait=True)
+    event_handler.io_pool.shutdown(wait=True)
+    decode_pool.shutdown(wait=True)
+    flush_records(event_handler.forget_records)
+    with pending_lock:
+        unsaved = [record for _, record in pending_records]
+    if unsaved:
+        print(f"[DATABASE] ❌ {len(unsaved)} record(s) could not be saved")
+        event_handler.forget_records(unsaved)
     print("✅ Folder watcher stopped.")
 
 if __name__ == "__main__":